@@ -1,15 +1,24 @@
-from flask import Flask, request, jsonify, send_from_directory
+# Patch sockets before boto3/urllib3 are imported so S3 calls yield to other greenlets
+from gevent import monkey
+monkey.patch_all()
+
+from flask import Flask, request, send_from_directory, redirect, abort
 from flask_cors import CORS
 import os
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError
+from boto3.s3.transfer import TransferConfig
 from dotenv import load_dotenv
 import mimetypes
 import uuid
-import threading
-import time
+import orjson
+from cachetools import TTLCache
+from threading import Lock
 from werkzeug.utils import secure_filename
 from urllib.parse import unquote
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
 from flask import Response
 
 app = Flask(__name__, static_folder='../frontend/dist')
@@ -25,8 +34,22 @@ def after_request(response):
     return response
 
 app.config['MAX_CONTENT_LENGTH'] = 200 * 1024 * 1024 
+
+# JSON (de)serialization with orjson, which is much faster than the stdlib
+# json module Flask uses for large image listings and categorization payloads
+def ojsonify(obj):
+    """Return obj as an application/json response"""
+    return Response(orjson.dumps(obj), mimetype='application/json')
+
+def request_json():
+    """Parse the request body as JSON"""
+    try:
+        return orjson.loads(request.get_data())
+    except orjson.JSONDecodeError:
+        abort(400, description="Invalid JSON body")
+
 # Image extensions to filter by
-IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp', '.svg', '.tiff']
+IMAGE_EXTENSIONS = frozenset(('jpg', 'jpeg', 'png', 'gif', 'bmp', 'webp', 'svg', 'tiff'))
 
 load_dotenv()
 
@@ -36,25 +59,139 @@ s3_session = boto3.Session(
     aws_secret_access_key=os.environ.get('AWS_SECRET_ACCESS_KEY'),
     region_name=os.environ.get('AWS_REGION', 'us-east-1')
 )
-s3_client = s3_session.client('s3')
-s3_resource = s3_session.resource('s3')
+# Size the connection pool above the worker count so parallel S3 calls don't queue
+# (uploads alone can use S3_UPLOAD_WORKERS x max_concurrency connections), and
+# back off adaptively when S3 throttles the parallel requests with SlowDown/503
+s3_config = Config(
+    max_pool_connections=96,
+    retries={'mode': 'adaptive', 'max_attempts': 6},
+    tcp_keepalive=True,
+    signature_version='s3v4'
+)
+s3_client = s3_session.client('s3', config=s3_config)
+s3_resource = s3_session.resource('s3', config=s3_config)
 S3_BUCKET = os.environ.get('S3_BUCKET_NAME')
 UNCATEGORIZED_FOLDER = "Uncategorized_Images/"
 
-# Cache for directory listings
-directory_cache = {}
+# Number of concurrent S3 operations when moving images
+S3_MOVE_WORKERS = 32
+# Number of files uploaded concurrently, each split into parallel parts above 8 MB
+S3_UPLOAD_WORKERS = 8
+upload_transfer_config = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=10,
+    use_threads=True
+)
+# Maximum number of keys accepted by a single DeleteObjects call
+S3_DELETE_BATCH_SIZE = 1000
+# Chunk size used when streaming image bodies from S3
+IMAGE_CHUNK_SIZE = 64 * 1024
+# Images larger than this are fetched as parallel ranged GETs
+IMAGE_PARALLEL_THRESHOLD = 8 * 1024 * 1024
+IMAGE_RANGE_SIZE = 4 * 1024 * 1024
+IMAGE_RANGE_WORKERS = 16
+# Lifetime of presigned image URLs, in seconds
+PRESIGNED_URL_EXPIRY = 900
+# Browsers may reuse a redirect until shortly before its presigned URL expires
+IMAGE_REDIRECT_CACHE_CONTROL = f'private, max-age={PRESIGNED_URL_EXPIRY - 60}'
+# Browser caching policy for proxied images
+IMAGE_CACHE_CONTROL = 'public, max-age=86400'
+# Serve image bytes through this server instead of redirecting to S3
+PROXY_IMAGES = os.environ.get('PROXY_IMAGES', 'false').lower() == 'true'
+
+# Cache for directory and image listings, shared across workers through Redis when configured
 cache_timeout = 300  # 5 minutes
+image_list_cache_timeout = 30
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    import redis
+    redis_client = redis.Redis.from_url(REDIS_URL)
+else:
+    redis_client = None
+    # TTLCache isn't thread-safe and S3 work runs on several threads/greenlets
+    directory_cache = TTLCache(maxsize=10000, ttl=cache_timeout)
+    cache_lock = Lock()
 
-def clear_expired_cache():
-    """Clear expired cache entries"""
-    current_time = time.time()
-    expired_keys = [k for k, v in directory_cache.items() if current_time - v['timestamp'] > cache_timeout]
-    for key in expired_keys:
-        directory_cache.pop(key, None)
+def listdir_cache_key(prefix, recursive=False):
+    """Cache key for the subdirectory listing of a prefix"""
+    return f"s3:listdir{'r' if recursive else ''}:{prefix}"
+
+def imagelist_cache_key(prefix):
+    """Cache key holding the cached pages of a prefix's image listing"""
+    return f"s3:listimg:{prefix}"
+
+def ancestor_prefixes(prefix):
+    """Return prefix and every parent prefix up to the bucket root"""
+    prefixes = [prefix]
+    while prefix:
+        prefix = prefix[:prefix.rstrip('/').rfind('/') + 1]
+        prefixes.append(prefix)
+    return prefixes
+
+def cache_get(key):
+    """Return the cached value for key, or None"""
+    if redis_client is not None:
+        try:
+            value = redis_client.get(key)
+        except redis.RedisError as e:
+            app.logger.warning(f"Cache read failed for {key}: {str(e)}")
+            return None
+        return orjson.loads(value) if value is not None else None
+    with cache_lock:
+        return directory_cache.get(key)
+
+def cache_set(key, value):
+    """Cache value under key for cache_timeout seconds"""
+    if redis_client is not None:
+        try:
+            redis_client.set(key, orjson.dumps(value), ex=cache_timeout)
+        except redis.RedisError as e:
+            app.logger.warning(f"Cache write failed for {key}: {str(e)}")
+    else:
+        with cache_lock:
+            directory_cache[key] = value
+
+# Image listings are only cached in Redis: a per-process cache can't be
+# invalidated across workers, and moved images would keep being listed
+def cache_get_page(key, page):
+    """Return a cached page of the listing under key, or None"""
+    if redis_client is None:
+        return None
+    try:
+        value = redis_client.hget(key, page)
+    except redis.RedisError as e:
+        app.logger.warning(f"Cache read failed for {key}: {str(e)}")
+        return None
+    return orjson.loads(value) if value is not None else None
+
+def cache_set_page(key, page, value):
+    """Cache a page of the listing under key; all pages of a listing expire together"""
+    if redis_client is None:
+        return
+    try:
+        pipe = redis_client.pipeline()
+        pipe.hset(key, page, orjson.dumps(value))
+        pipe.expire(key, image_list_cache_timeout)
+        pipe.execute()
+    except redis.RedisError as e:
+        app.logger.warning(f"Cache write failed for {key}: {str(e)}")
+
+def cache_delete(*keys):
+    """Remove keys from the cache"""
+    if redis_client is not None:
+        try:
+            redis_client.delete(*keys)
+        except redis.RedisError as e:
+            app.logger.warning(f"Cache invalidation failed for {', '.join(keys)}: {str(e)}")
+    else:
+        with cache_lock:
+            for key in keys:
+                directory_cache.pop(key, None)
 
 @app.route("/")
 def index():
-    return jsonify({
+    return ojsonify({
         "message": "Welcome to the API!",
         "status": "running"
     })
@@ -62,19 +199,21 @@ def index():
 @app.route('/api/list-directories', methods=['GET'])
 def list_directories():
     """List S3 directories (prefixes) with caching"""
-    cache_key = "root_directories"
-    
-    # Check cache first
-    if cache_key in directory_cache:
-        cache_entry = directory_cache[cache_key]
-        if time.time() - cache_entry['timestamp'] < cache_timeout:
-            return jsonify({"directories": cache_entry['data']})
+    cache_key = listdir_cache_key("")
     
     try:
-        # List the top-level "directories" (prefixes) in the S3 bucket
-        response = s3_client.list_objects_v2(
+        # Check cache first
+        cached = cache_get(cache_key)
+        if cached is not None:
+            return ojsonify({"directories": cached})
+        
+        # List the top-level "directories" (prefixes) in the S3 bucket,
+        # paginating so buckets with more than 1000 prefixes aren't truncated
+        paginator = s3_client.get_paginator('list_objects_v2')
+        pages = paginator.paginate(
             Bucket=S3_BUCKET,
-            Delimiter='/'
+            Delimiter='/',
+            PaginationConfig={'PageSize': 1000}
         )
         
         directories = []
@@ -82,52 +221,54 @@ def list_directories():
         # Add the root directory
         #directories.append({"path": "", "name": "Root"})
         
-        # Add the common prefixes (folders)
-        if 'CommonPrefixes' in response:
-            for prefix in response['CommonPrefixes']:
-                prefix_name = prefix['Prefix'].rstrip('/')
-                directories.append({
-                    "path": prefix['Prefix'],
-                    "name": prefix_name
-                })
+        # Add the common prefixes (folders) from all pages
+        for page in pages:
+            if 'CommonPrefixes' in page:
+                for prefix in page['CommonPrefixes']:
+                    prefix_name = prefix['Prefix'].rstrip('/')
+                    directories.append({
+                        "path": prefix['Prefix'],
+                        "name": prefix_name
+                    })
         
         # Update cache
-        directory_cache[cache_key] = {
-            'data': directories,
-            'timestamp': time.time()
-        }
+        cache_set(cache_key, directories)
         
-        return jsonify({"directories": directories})
+        return ojsonify({"directories": directories})
     except Exception as e:
         print("Error in list-directories:", str(e))
-        return jsonify({"error": str(e)}), 500
+        return ojsonify({"error": str(e)}), 500
 
 @app.route('/api/list-subdirectories', methods=['POST'])
 def list_subdirectories():
     """List subdirectories (prefixes) within a given S3 prefix with caching"""
-    data = request.json
+    data = request_json()
     parent_prefix = data.get('directory', '')
-    
-    # Create cache key
-    cache_key = f"subdirs_{parent_prefix}"
-    
-    # Check cache first
-    if cache_key in directory_cache:
-        cache_entry = directory_cache[cache_key]
-        if time.time() - cache_entry['timestamp'] < cache_timeout:
-            return jsonify({"subdirectories": cache_entry['data']})
+    recursive = data.get('recursive', False)
     
     try:
         # Ensure the prefix ends with a slash if it's not empty
         if parent_prefix and not parent_prefix.endswith('/'):
             parent_prefix += '/'
+        
+        # Check cache first
+        cache_key = listdir_cache_key(parent_prefix, recursive)
+        cached = cache_get(cache_key)
+        if cached is not None:
+            return ojsonify({"subdirectories": cached})
+        
+        if recursive:
+            subdirs = list_all_subdirectories(parent_prefix)
+            cache_set(cache_key, subdirs)
+            return ojsonify({"subdirectories": subdirs})
             
         # Use pagination to handle large directories
         paginator = s3_client.get_paginator('list_objects_v2')
         pages = paginator.paginate(
             Bucket=S3_BUCKET,
             Prefix=parent_prefix,
-            Delimiter='/'
+            Delimiter='/',
+            PaginationConfig={'PageSize': 1000}
         )
         
         subdirs = []
@@ -150,76 +291,97 @@ def list_subdirectories():
                     })
         
         # Update cache
-        directory_cache[cache_key] = {
-            'data': subdirs,
-            'timestamp': time.time()
-        }
+        cache_set(cache_key, subdirs)
         
-        return jsonify({"subdirectories": subdirs})
+        return ojsonify({"subdirectories": subdirs})
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return ojsonify({"error": str(e)}), 500
 
 @app.route('/api/list-images', methods=['POST'])
 def list_images():
-    """List all images in a specified S3 prefix with pagination"""
-    data = request.json
+    """List one page of images in a specified S3 prefix.
+
+    Pages are addressed by the S3 continuation token returned as
+    nextContinuationToken, so each request lists at most pageSize keys.
+    """
+    data = request_json()
     folder_path = data.get('folderPath', '')
-    page_size = data.get('pageSize', 2000)
-    page = data.get('page', 1)
+    continuation_token = data.get('continuationToken')
     
     try:
+        # S3 returns at most 1000 keys per request
+        try:
+            page_size = int(data.get('pageSize', 1000))
+        except (TypeError, ValueError):
+            return ojsonify({"error": "pageSize must be an integer"}), 400
+        page_size = max(1, min(page_size, 1000))
+        
         # Ensure the prefix ends with a slash if it's not empty
         if folder_path and not folder_path.endswith('/'):
             folder_path += '/'
-            
-        # Use pagination to handle large directories
-        paginator = s3_client.get_paginator('list_objects_v2')
-        pages = paginator.paginate(
-            Bucket=S3_BUCKET,
-            Prefix=folder_path
-        )
+        
+        # Check cache first
+        cache_key = imagelist_cache_key(folder_path)
+        cache_page = f"{page_size}:{continuation_token or ''}"
+        cached = cache_get_page(cache_key, cache_page)
+        if cached is not None:
+            return ojsonify(cached)
+        
+        list_args = {
+            'Bucket': S3_BUCKET,
+            'Prefix': folder_path,
+            'MaxKeys': page_size
+        }
+        if continuation_token:
+            list_args['ContinuationToken'] = continuation_token
+        
+        # Fetch only the requested page
+        try:
+            page_response = s3_client.list_objects_v2(**list_args)
+        except ClientError as e:
+            # S3 rejects malformed or expired continuation tokens
+            if continuation_token and e.response['Error']['Code'] == 'InvalidArgument':
+                return ojsonify({"error": "Invalid continuationToken"}), 400
+            raise
         
         image_files = []
         
-        # Process all pages
-        for page_response in pages:
-            # Process objects (files)
-            if 'Contents' in page_response:
-                for obj in page_response['Contents']:
-                    # Skip "directory" objects (ending with /)
-                    if obj['Key'].endswith('/'):
-                        continue
-                        
-                    # Check if the file is an image
-                    file_ext = os.path.splitext(obj['Key'])[1].lower()
-                    if file_ext in IMAGE_EXTENSIONS:
-                        # Extract the filename from the key
-                        filename = obj['Key'][len(folder_path):] if folder_path else obj['Key']
-                        image_files.append({
-                            "filename": filename,
-                            "key": obj['Key'],
-                            "lastModified": obj['LastModified'].isoformat(),
-                            "size": obj['Size']
-                        })
-        
-        # Total count of images
-        total_count = len(image_files)
-        
-        # Calculate pagination
-        start_idx = (page - 1) * page_size
-        end_idx = start_idx + page_size
-        paginated_images = image_files[start_idx:end_idx]
-        
-        return jsonify({
-            "images": paginated_images,
-            "totalCount": total_count,
+        # Process objects (files)
+        for obj in page_response.get('Contents', []):
+            key = obj['Key']
+            # Skip "directory" objects (ending with /)
+            if not key or key[-1] == '/':
+                continue
+                
+            # Check if the file is an image
+            dot = key.rfind('.')
+            if dot < 0 or key[dot + 1:].lower() not in IMAGE_EXTENSIONS:
+                continue
+            
+            # Extract the filename from the key
+            filename = key[len(folder_path):] if folder_path else key
+            image_files.append({
+                "filename": filename,
+                "key": key,
+                "lastModified": obj['LastModified'].isoformat(),
+                "size": obj['Size']
+            })
+        
+        next_token = page_response.get('NextContinuationToken') if page_response.get('IsTruncated') else None
+        
+        result = {
+            "images": image_files,
             "folderPath": folder_path,
-            "currentPage": page,
             "pageSize": page_size,
-            "totalPages": (total_count + page_size - 1) // page_size
-        })
+            "nextContinuationToken": next_token
+        }
+        
+        # Update cache
+        cache_set_page(cache_key, cache_page, result)
+        
+        return ojsonify(result)
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return ojsonify({"error": str(e)}), 500
 
 @app.route('/api/image/<path:key>')
 def get_image(key):
@@ -228,36 +390,140 @@ def get_image(key):
         # Decode the URL-encoded key
         decoded_key = unquote(key)
         
-        # Get the object from S3
-        response = s3_client.get_object(
-            Bucket=S3_BUCKET,
-            Key=decoded_key
-        )
+        # Let the browser fetch the bytes directly from S3
+        if not PROXY_IMAGES:
+            url = s3_client.generate_presigned_url(
+                'get_object',
+                Params={'Bucket': S3_BUCKET, 'Key': decoded_key},
+                ExpiresIn=PRESIGNED_URL_EXPIRY
+            )
+            response = redirect(url, code=302)
+            response.headers['Cache-Control'] = IMAGE_REDIRECT_CACHE_CONTROL
+            return response
+        
+        # Let S3 answer conditional requests so unchanged images aren't re-sent
+        conditional_args = {}
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match:
+            conditional_args['IfNoneMatch'] = if_none_match
+        
+        # Get the object from S3. The first request covers IMAGE_PARALLEL_THRESHOLD
+        # bytes, which is the whole object for typical images, and tells us the total size
+        try:
+            try:
+                response = s3_client.get_object(
+                    Bucket=S3_BUCKET,
+                    Key=decoded_key,
+                    Range=f"bytes=0-{IMAGE_PARALLEL_THRESHOLD - 1}",
+                    **conditional_args
+                )
+                total_size = int(response['ContentRange'].rsplit('/', 1)[1])
+            except ClientError as e:
+                # Empty objects can't satisfy a range request
+                if e.response['Error']['Code'] != 'InvalidRange':
+                    raise
+                response = s3_client.get_object(
+                    Bucket=S3_BUCKET,
+                    Key=decoded_key,
+                    **conditional_args
+                )
+                total_size = response['ContentLength']
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('304', 'NotModified'):
+                # Echo the ETag S3 matched, not the client's (possibly list or *) header
+                headers = {'Cache-Control': IMAGE_CACHE_CONTROL}
+                etag = e.response.get('ResponseMetadata', {}).get('HTTPHeaders', {}).get('etag')
+                if etag:
+                    headers['ETag'] = etag
+                return '', 304, headers
+            raise
         
-        # Get the file content
-        file_content = response['Body'].read()
+        # Stream the body to the client instead of buffering it in memory
+        body = response['Body']
+        
+        def generate():
+            executor = None
+            try:
+                # Fetch the remainder of large images as parallel ranged GETs,
+                # keeping at most IMAGE_RANGE_WORKERS ranges in flight so a slow
+                # client doesn't make us buffer the whole object
+                pending = deque()
+                starts = iter(range(IMAGE_PARALLEL_THRESHOLD, total_size, IMAGE_RANGE_SIZE))
+                
+                def submit_next():
+                    start = next(starts, None)
+                    if start is not None:
+                        pending.append(executor.submit(
+                            get_object_range,
+                            decoded_key,
+                            start,
+                            min(start + IMAGE_RANGE_SIZE, total_size) - 1,
+                            response['ETag']
+                        ))
+                
+                if total_size > IMAGE_PARALLEL_THRESHOLD:
+                    executor = ThreadPoolExecutor(max_workers=IMAGE_RANGE_WORKERS)
+                    for _ in range(IMAGE_RANGE_WORKERS):
+                        submit_next()
+                
+                yield from body.iter_chunks(chunk_size=IMAGE_CHUNK_SIZE)
+                
+                # Yield the ranges in order, requesting the next one as each is sent
+                while pending:
+                    chunk = pending.popleft().result()
+                    submit_next()
+                    yield chunk
+            finally:
+                if executor:
+                    executor.shutdown(wait=False, cancel_futures=True)
         
         # Determine content type
         content_type = response.get('ContentType', 'application/octet-stream')
         
         # Return the file
-        return Response(
-            file_content,
-            mimetype=content_type
+        image_response = Response(
+            generate(),
+            mimetype=content_type,
+            headers={
+                'Content-Length': str(total_size),
+                'ETag': response['ETag'],
+                'Last-Modified': response['LastModified'].strftime('%a, %d %b %Y %H:%M:%S GMT'),
+                'Cache-Control': IMAGE_CACHE_CONTROL
+            }
         )
+        # Release the S3 connection even when the body is never iterated
+        # (HEAD requests, clients that disconnect before the first chunk)
+        image_response.call_on_close(body.close)
+        return image_response
     except Exception as e:
         app.logger.error(f"Error serving image {key}: {str(e)}")
-        return jsonify({"error": str(e)}), 500
+        return ojsonify({"error": str(e)}), 500
     
 @app.route('/api/save-categorized', methods=['POST'])
 def save_categorized():
     """Move categorized images to new folders in S3 based on categories"""
-    data = request.json
+    data = request_json()
     source_folder = data.get('sourceFolder', '')
     categorized_images = data.get('categorizedImages', [])
+    skip_existing = data.get('skipExisting', False)
     
-    if not categorized_images:
-        return jsonify({"error": "No categorized images provided"}), 400
+    # Keep well-formed entries only, moving each file once
+    jobs = []
+    seen = set()
+    for img_data in categorized_images:
+        try:
+            filename, category = img_data['filename'], img_data['category']
+        except (KeyError, TypeError):
+            continue
+        if not (isinstance(filename, str) and filename and isinstance(category, str) and category):
+            continue
+        if filename in seen:
+            continue
+        seen.add(filename)
+        jobs.append((filename, category))
+    
+    if not jobs:
+        return ojsonify({"error": "No categorized images provided"}), 400
     
     try:
         # Ensure the source folder ends with a slash if it's not empty
@@ -271,140 +537,251 @@ def save_categorized():
         dest_parent = "CategorizedFiles/"
         
         # Process each image
-        results = []
-        bucket = s3_resource.Bucket(S3_BUCKET)
-        
-        for img_data in categorized_images:
-            if 'filename' not in img_data or 'category' not in img_data:
-                continue
-                
-            filename = img_data['filename']
-            category = img_data['category']
-            
-            # Source and destination paths in S3
-            source_key = os.path.join(source_folder, filename).replace('\\', '/')
-            name, ext = os.path.splitext(filename)
-            new_filename = f"{name}_{category}{ext}"
-            dest_key = os.path.join(dest_parent, category, new_filename).replace('\\', '/')
+        def _move_one(job):
+            filename, category = job
+            source_key = None
             
             try:
-                # Copy the object within S3
-                bucket.copy(
-                    {'Bucket': S3_BUCKET, 'Key': source_key},
-                    dest_key
-                )
+                # Source and destination paths in S3 (both folders end with '/')
+                source_key = source_folder + filename
+                dot = filename.rfind('.')
+                if dot > filename.rfind('/') + 1:
+                    name, ext = filename[:dot], filename[dot:]
+                else:
+                    name, ext = filename, ''
+                new_filename = f"{name}_{category}{ext}"
+                dest_key = f"{dest_parent}{category}/{new_filename}"
                 
-                # Delete the original file
-                s3_client.delete_object(
-                    Bucket=S3_BUCKET,
-                    Key=source_key
-                )
+                # Skip the copy when the same object is already in place. CopyObject
+                # preserves the ETag of single-part objects, so matching size and ETag
+                # means the destination holds this source's bytes; multipart sources
+                # never match and are simply copied again
+                skipped = False
+                if skip_existing:
+                    dest_head = head_key(dest_key)
+                    if dest_head is not None:
+                        source_head = s3_client.head_object(Bucket=S3_BUCKET, Key=source_key)
+                        skipped = (dest_head['ContentLength'] == source_head['ContentLength'] and
+                                   dest_head['ETag'] == source_head['ETag'])
                 
-                results.append({
+                # Copy the object within S3; the original is deleted in bulk afterwards
+                if not skipped:
+                    copy_key(source_key, dest_key)
+                
+                return source_key, {
                     "original": filename,
                     "renamed": new_filename,
                     "category": category,
+                    "skipped": skipped,
                     "success": True
-                })
+                }
             except Exception as e:
-                results.append({
+                return source_key, {
                     "original": filename,
                     "error": str(e),
                     "success": False
-                })
+                }
+        
+        # Overlap the per-image S3 round-trips
+        with ThreadPoolExecutor(max_workers=S3_MOVE_WORKERS) as executor:
+            moved = list(executor.map(_move_one, jobs))
         
-        # Clear the cache for this directory
-        cache_key = f"subdirs_{source_folder}"
-        if cache_key in directory_cache:
-            directory_cache.pop(cache_key)
+        # Delete the originals of every successful copy with batched DeleteObjects calls
+        delete_errors = delete_keys([k for k, r in moved if r['success']])
+        for source_key, result in moved:
+            if result['success'] and source_key in delete_errors:
+                result.pop('renamed')
+                result.pop('category')
+                result['error'] = delete_errors[source_key]
+                result['success'] = False
+        results = [r for _, r in moved]
         
-        return jsonify({
+        # Clear the cache for this directory and the new category folders.
+        # Image and recursive folder listings cover subfolders, so every
+        # enclosing folder's listing changes too
+        changed_folders = {source_folder} | {f"{dest_parent}{category}/" for _, category in jobs}
+        changed_prefixes = {p for folder in changed_folders for p in ancestor_prefixes(folder)}
+        cache_delete(
+            listdir_cache_key(source_folder),
+            listdir_cache_key(dest_parent),
+            *[listdir_cache_key(p, recursive=True) for p in changed_prefixes],
+            *[imagelist_cache_key(p) for p in changed_prefixes]
+        )
+        
+        return ojsonify({
             "results": results,
-            "categorizedCount": len([r for r in results if r.get('success', False)]),
+            "categorizedCount": sum(1 for r in results if r['success']),
             "destinationFolder": dest_parent
         })
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return ojsonify({"error": str(e)}), 500
 
 
 @app.route('/api/upload-images', methods=['POST'])
 def upload_images():
     """Upload images to the Uncategorized_Images folder in S3"""
     if 'files' not in request.files:
-        return jsonify({"error": "No files provided"}), 400
+        return ojsonify({"error": "No files provided"}), 400
     
     uploaded_files = request.files.getlist('files')
     
     if not uploaded_files or uploaded_files[0].filename == '':
-        return jsonify({"error": "No files selected"}), 400
+        return ojsonify({"error": "No files selected"}), 400
     
-    results = []
-    
-    for file in uploaded_files:
-        if file and allowed_file(file.filename):
-            try:
-                # Secure the filename
-                filename = secure_filename(file.filename)
-                
-                # Generate a unique filename to avoid collisions
-                unique_filename = f"{uuid.uuid4().hex}_{filename}"
-                
-                # Set the S3 key for the uncategorized folder
-                s3_key = f"{UNCATEGORIZED_FOLDER}{unique_filename}"
-                
-                # Determine the content type
-                content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
-                
-                # Upload the file to S3
-                s3_client.upload_fileobj(
-                    file,
-                    S3_BUCKET,
-                    s3_key,
-                    ExtraArgs={
-                        'ContentType': content_type
-                    }
-                )
-                
-                results.append({
-                    "originalName": filename,
-                    "storedName": unique_filename,
-                    "s3Key": s3_key,
-                    "success": True
-                })
-            except Exception as e:
-                results.append({
-                    "originalName": file.filename,
-                    "error": str(e),
-                    "success": False
-                })
-        else:
-            results.append({
+    def _upload_one(file):
+        if not (file and allowed_file(file.filename)):
+            return {
                 "originalName": file.filename,
                 "error": "File type not allowed",
                 "success": False
-            })
+            }
+        
+        try:
+            # Secure the filename
+            filename = secure_filename(file.filename)
+            
+            # Generate a unique filename to avoid collisions
+            unique_filename = f"{uuid.uuid4().hex}_{filename}"
+            
+            # Set the S3 key for the uncategorized folder
+            s3_key = f"{UNCATEGORIZED_FOLDER}{unique_filename}"
+            
+            # Determine the content type
+            content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+            
+            # Upload the file to S3, as parallel multipart parts when it's large
+            s3_client.upload_fileobj(
+                file.stream,
+                S3_BUCKET,
+                s3_key,
+                ExtraArgs={
+                    'ContentType': content_type
+                },
+                Config=upload_transfer_config
+            )
+            
+            return {
+                "originalName": filename,
+                "storedName": unique_filename,
+                "s3Key": s3_key,
+                "success": True
+            }
+        except Exception as e:
+            return {
+                "originalName": file.filename,
+                "error": str(e),
+                "success": False
+            }
+    
+    # Upload several files at once
+    with ThreadPoolExecutor(max_workers=S3_UPLOAD_WORKERS) as executor:
+        results = list(executor.map(_upload_one, uploaded_files))
     
     # Clear the cache for the uncategorized folder
-    cache_key = f"subdirs_{UNCATEGORIZED_FOLDER}"
-    if cache_key in directory_cache:
-        directory_cache.pop(cache_key)
+    cache_delete(
+        listdir_cache_key(UNCATEGORIZED_FOLDER),
+        *[listdir_cache_key(p, recursive=True) for p in ancestor_prefixes(UNCATEGORIZED_FOLDER)],
+        *[imagelist_cache_key(p) for p in ancestor_prefixes(UNCATEGORIZED_FOLDER)]
+    )
     
-    return jsonify({
+    return ojsonify({
         "results": results,
-        "uploadedCount": len([r for r in results if r.get('success', False)]),
+        "uploadedCount": sum(1 for r in results if r['success']),
         "destinationFolder": UNCATEGORIZED_FOLDER
     })
 
 def allowed_file(filename):
     """Check if the file extension is allowed"""
     return '.' in filename and \
-           os.path.splitext(filename)[1].lower() in IMAGE_EXTENSIONS
+           filename.rpartition('.')[2].lower() in IMAGE_EXTENSIONS
+
+# Utility function to delete many keys with as few S3 calls as possible
+def delete_keys(keys):
+    """Delete keys in batches of S3_DELETE_BATCH_SIZE, returning {key: error} for failures"""
+    errors = {}
+    for i in range(0, len(keys), S3_DELETE_BATCH_SIZE):
+        batch = keys[i:i + S3_DELETE_BATCH_SIZE]
+        try:
+            response = s3_client.delete_objects(
+                Bucket=S3_BUCKET,
+                Delete={'Objects': [{'Key': k} for k in batch], 'Quiet': True}
+            )
+            for err in response.get('Errors', []):
+                errors[err['Key']] = err.get('Message', err.get('Code', 'Delete failed'))
+        except Exception as e:
+            for k in batch:
+                errors[k] = str(e)
+    return errors
+
+# Utility function to copy an object within the bucket
+def copy_key(source_key, dest_key):
+    """Copy with a single CopyObject call, falling back to a multipart
+    copy for objects above the 5 GB CopyObject limit"""
+    copy_source = {'Bucket': S3_BUCKET, 'Key': source_key}
+    try:
+        s3_client.copy_object(
+            Bucket=S3_BUCKET,
+            CopySource=copy_source,
+            Key=dest_key
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'InvalidRequest':
+            raise
+        s3_resource.Bucket(S3_BUCKET).copy(copy_source, dest_key)
+
+# Utility function to list every nested folder under a prefix
+def list_all_subdirectories(parent_prefix):
+    """Derive all subfolders from the object keys under parent_prefix.
+
+    Listing without a delimiter returns the whole tree in ceil(N/1000)
+    requests instead of one paginated listing per folder.
+    """
+    paginator = s3_client.get_paginator('list_objects_v2')
+    pages = paginator.paginate(
+        Bucket=S3_BUCKET,
+        Prefix=parent_prefix,
+        PaginationConfig={'PageSize': 1000}
+    )
+    
+    folders = set()
+    for page in pages:
+        for obj in page.get('Contents', []):
+            relative_key = obj['Key'][len(parent_prefix):]
+            end = relative_key.find('/')
+            while end >= 0:
+                folders.add(relative_key[:end])
+                end = relative_key.find('/', end + 1)
+    
+    return [
+        {"path": f"{parent_prefix}{name}/", "name": name}
+        for name in sorted(folders)
+        if name
+    ]
+
+# Utility function to read a byte range of an S3 object
+def get_object_range(key, start, end, etag):
+    # IfMatch fails the request if the object was overwritten since the first GET
+    response = s3_client.get_object(
+        Bucket=S3_BUCKET,
+        Key=key,
+        Range=f"bytes={start}-{end}",
+        IfMatch=etag
+    )
+    return response['Body'].read()
+
+# Utility function to fetch an object's metadata, or None if it doesn't exist
+def head_key(key):
+    try:
+        return s3_client.head_object(Bucket=S3_BUCKET, Key=key)
+    except ClientError as e:
+        if e.response['Error']['Code'] in ('404', 'NoSuchKey'):
+            return None
+        raise
 
 # Utility function to check if a key exists in S3
 def key_exists(key):
     try:
-        s3_client.head_object(Bucket=S3_BUCKET, Key=key)
-        return True
+        return head_key(key) is not None
     except ClientError:
         return False
 
@@ -417,15 +794,5 @@ def serve(path):
     else:
         return send_from_directory(app.static_folder, 'index.html')
 
-# Start a background thread to clear expired cache entries
-def cache_cleaner():
-    while True:
-        clear_expired_cache()
-        time.sleep(60)  # Run every minute
-
 if __name__ == '__main__':
-    # Start cache cleaner in background
-    cache_thread = threading.Thread(target=cache_cleaner, daemon=True)
-    cache_thread.start()
-    
     app.run(host="0.0.0.0", port=8080)
\ No newline at end of file
@@ -0,0 +1,18 @@
+# Gunicorn settings, loaded automatically from the working directory.
+# Request handlers spend almost all their time waiting on S3, so each worker
+# multiplexes many concurrent requests on gevent greenlets.
+import os
+import sys
+
+# Listing caches are only shared between workers through Redis. Without
+# REDIS_URL each process keeps its own cache, and invalidation after a move
+# or upload reaches just one of them, so default to a single worker.
+workers = int(os.environ.get('WEB_CONCURRENCY', 4 if os.environ.get('REDIS_URL') else 1))
+if workers > 1 and not os.environ.get('REDIS_URL'):
+    print(
+        f"WARNING: {workers} workers without REDIS_URL; directory listings are cached "
+        "per process and may stay stale for up to 5 minutes after moves and uploads",
+        file=sys.stderr
+    )
+worker_class = 'gevent'
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000))